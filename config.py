@@ -1,8 +1,16 @@
 import json
 import os
+import tempfile
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 CONFIG_DIR = os.path.expanduser("~/.pyenvy")
 CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
+SCAN_CACHE_FILE = os.path.join(CONFIG_DIR, "scan_cache.json")
+VERSION_CACHE_FILE = os.path.join(CONFIG_DIR, "versions.json")
 
 DEFAULT_CONFIG = {
     "managed_venvs": [],
@@ -14,27 +22,80 @@ DEFAULT_CONFIG = {
 }
 
 
+_saved_hash = None
+
+
+def _json_loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_dumps(data, indent=False, sort_keys=False):
+    if orjson is not None:
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, indent=2 if indent else None, sort_keys=sort_keys).encode()
+
+
+def _config_hash(data):
+    return hash(_json_dumps(data, sort_keys=True))
+
+
+def _write_json_atomic(path, data, indent=False):
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CONFIG_DIR, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_json_dumps(data, indent=indent))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _with_managed_set(config):
+    config["managed_venvs"] = list(config["managed_venvs"])
+    config["_managed_set"] = set(config["managed_venvs"])
+    return config
+
+
 def load_config():
+    global _saved_hash
     if os.path.exists(CONFIG_FILE):
         try:
-            with open(CONFIG_FILE, "r") as f:
-                data = json.load(f)
+            with open(CONFIG_FILE, "rb") as f:
+                data = _json_loads(f.read())
+            _saved_hash = _config_hash(data)
             merged = {**DEFAULT_CONFIG, **data}
-            return merged
-        except (json.JSONDecodeError, IOError):
-            return dict(DEFAULT_CONFIG)
-    return dict(DEFAULT_CONFIG)
+            return _with_managed_set(merged)
+        except (ValueError, IOError):
+            return _with_managed_set(dict(DEFAULT_CONFIG))
+    return _with_managed_set(dict(DEFAULT_CONFIG))
 
 
 def save_config(config):
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=2)
+    global _saved_hash
+    data = {k: v for k, v in config.items() if not k.startswith("_")}
+    digest = _config_hash(data)
+    if digest == _saved_hash:
+        return
+    _write_json_atomic(CONFIG_FILE, data, indent=True)
+    _saved_hash = digest
 
 
 def add_managed_venv(config, venv_path):
     path = os.path.abspath(venv_path)
-    if path not in config["managed_venvs"]:
+    managed = config.get("_managed_set")
+    if managed is None:
+        managed = config["_managed_set"] = set(config["managed_venvs"])
+    if path not in managed:
+        managed.add(path)
         config["managed_venvs"].append(path)
     return config
 
@@ -42,4 +103,31 @@ def add_managed_venv(config, venv_path):
 def remove_managed_venv(config, venv_path):
     path = os.path.abspath(venv_path)
     config["managed_venvs"] = [p for p in config["managed_venvs"] if p != path]
+    config.get("_managed_set", set()).discard(path)
     return config
+
+
+def load_scan_cache():
+    try:
+        with open(SCAN_CACHE_FILE, "rb") as f:
+            data = _json_loads(f.read())
+        return data if isinstance(data, dict) else {}
+    except (ValueError, IOError):
+        return {}
+
+
+def save_scan_cache(cache):
+    _write_json_atomic(SCAN_CACHE_FILE, cache)
+
+
+def load_version_cache():
+    try:
+        with open(VERSION_CACHE_FILE, "rb") as f:
+            data = _json_loads(f.read())
+        return data if isinstance(data, dict) else {}
+    except (ValueError, IOError):
+        return {}
+
+
+def save_version_cache(cache):
+    _write_json_atomic(VERSION_CACHE_FILE, cache)
@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 import os
+import stat
 import sys
+import time
 
-from PyQt6.QtCore import Qt, QSettings
-from PyQt6.QtGui import QAction, QFont
+from PyQt6.QtCore import (
+    Qt, QSettings, QTimer, QAbstractTableModel, QModelIndex, QSortFilterProxyModel,
+)
+from PyQt6.QtGui import QAction, QBrush, QFont
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QSplitter, QListWidget, QListWidgetItem, QTreeWidget, QTreeWidgetItem,
+    QSplitter, QListWidget, QListWidgetItem, QTreeView,
     QLabel, QLineEdit, QPushButton, QToolBar, QStatusBar, QProgressBar,
     QDialog, QFormLayout, QComboBox, QCheckBox, QDialogButtonBox,
     QFileDialog, QMessageBox, QGroupBox, QHeaderView, QFrame,
@@ -16,8 +20,52 @@ import config
 import venv_manager
 import workers
 
+FILTER_DEBOUNCE_MS = 150
+PYTHON_CACHE_TTL = 600
+CONFIG_SAVE_DELAY_MS = 500
+PACKAGE_LOAD_DELAY_MS = 300
+
+
+class PackageTableModel(QAbstractTableModel):
+    HEADERS = ("Package", "Version")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pkg_names = []
+        self._pkg_versions = []
+
+    def set_packages(self, packages):
+        names = [p.name for p in packages]
+        versions = [p.version for p in packages]
+        if names == self._pkg_names and versions == self._pkg_versions:
+            return
+        self.beginResetModel()
+        self._pkg_names = names
+        self._pkg_versions = versions
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._pkg_names)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        column = self._pkg_names if index.column() == 0 else self._pkg_versions
+        return column[index.row()]
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
 
 class CreateVenvDialog(QDialog):
+    _python_installs_cache = None
+    _python_waiters = []
+
     def __init__(self, parent, default_location, task_manager):
         super().__init__(parent)
         self.setWindowTitle("Create New Virtual Environment")
@@ -70,12 +118,55 @@ class CreateVenvDialog(QDialog):
         if d:
             self.loc_edit.setText(d)
 
+    @classmethod
+    def cached_python_installs(cls):
+        cached = cls._python_installs_cache
+        if cached and time.monotonic() - cached[0] < PYTHON_CACHE_TTL:
+            return cached[1]
+        return None
+
+    @classmethod
+    def store_python_installs(cls, installs):
+        # An empty result is usually transient (e.g. Python being installed);
+        # don't pin "No Python found" for the whole TTL.
+        cls._python_installs_cache = (time.monotonic(), installs) if installs else None
+
+    @classmethod
+    def clear_python_installs(cls):
+        cls._python_installs_cache = None
+
+    @classmethod
+    def request_python_installs(cls, task_manager, callback=None):
+        cached = cls.cached_python_installs()
+        if cached is not None:
+            if callback:
+                callback(cached)
+            return
+        if callback:
+            cls._python_waiters.append(callback)
+        # Join a detection already in flight (e.g. the startup prefetch)
+        # instead of starting a second one.
+        if not task_manager.is_running("detect_pythons"):
+            task_manager.run(
+                "detect_pythons",
+                venv_manager.detect_python_versions, (),
+                on_success=cls._on_python_installs,
+                on_error=lambda e: cls._on_python_installs([]),
+            )
+
+    @classmethod
+    def _on_python_installs(cls, installs):
+        cls.store_python_installs(installs)
+        waiters, cls._python_waiters = cls._python_waiters, []
+        for callback in waiters:
+            callback(installs)
+
+    @classmethod
+    def prefetch_pythons(cls, task_manager):
+        cls.request_python_installs(task_manager)
+
     def _detect_pythons(self):
-        self.task_manager.run(
-            "detect_pythons",
-            venv_manager.detect_python_versions, (),
-            on_success=self._on_pythons_detected,
-        )
+        self.request_python_installs(self.task_manager, self._on_pythons_detected)
 
     def _on_pythons_detected(self, installs):
         self.python_installs = installs
@@ -121,18 +212,30 @@ class PyEnvyApp(QMainWindow):
         self.setMinimumSize(800, 500)
 
         self.cfg = config.load_config()
+        self._cfg_dirty = False
+        self._cfg_save_timer = QTimer(self)
+        self._cfg_save_timer.setSingleShot(True)
+        self._cfg_save_timer.setInterval(CONFIG_SAVE_DELAY_MS)
+        self._cfg_save_timer.timeout.connect(self._flush_config)
         self.settings = QSettings("PyEnvy", "PyEnvy")
         self.task_manager = workers.TaskManager(status_callback=self._update_status)
+        self.task_manager.busyChanged.connect(self._on_busy_changed)
+        self._busy = False
 
         self.all_venvs = []
+        self._venv_names_ci = []
         self.selected_venv = None
         self.all_packages = []
+        self._pkg_cache = {}
+        self._gray_brush = QBrush(Qt.GlobalColor.gray)
 
         self._build_toolbar()
         self._build_central()
         self._build_status_bar()
-        self._restore_geometry()
+        self.resize(1000, 650)
+        QTimer.singleShot(0, self._restore_geometry)
         self._refresh_venvs()
+        CreateVenvDialog.prefetch_pythons(self.task_manager)
 
     # ── Toolbar ─────────────────────────────────────────────────────
 
@@ -169,7 +272,7 @@ class PyEnvyApp(QMainWindow):
         toolbar.addWidget(spacer)
 
         self.act_refresh = QAction("Refresh", self)
-        self.act_refresh.triggered.connect(self._refresh_venvs)
+        self.act_refresh.triggered.connect(self._force_refresh_venvs)
         toolbar.addAction(self.act_refresh)
 
     # ── Central Widget ──────────────────────────────────────────────
@@ -189,10 +292,20 @@ class PyEnvyApp(QMainWindow):
 
         self.venv_filter = QLineEdit()
         self.venv_filter.setPlaceholderText("Filter...")
-        self.venv_filter.textChanged.connect(self._filter_venv_list)
+        self._venv_filter_timer = QTimer(self)
+        self._venv_filter_timer.setSingleShot(True)
+        self._venv_filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self._venv_filter_timer.timeout.connect(self._filter_venv_list)
+        self.venv_filter.textChanged.connect(lambda _: self._venv_filter_timer.start())
         sidebar_layout.addWidget(self.venv_filter)
 
+        self._pkg_load_timer = QTimer(self)
+        self._pkg_load_timer.setSingleShot(True)
+        self._pkg_load_timer.setInterval(PACKAGE_LOAD_DELAY_MS)
+        self._pkg_load_timer.timeout.connect(self._load_packages)
+
         self.venv_list = QListWidget()
+        self.venv_list.setUniformItemSizes(True)
         self.venv_list.currentRowChanged.connect(self._on_venv_selected)
         sidebar_layout.addWidget(self.venv_list)
 
@@ -231,21 +344,34 @@ class PyEnvyApp(QMainWindow):
         pkg_filter_row.addWidget(QLabel("Filter:"))
         self.pkg_filter = QLineEdit()
         self.pkg_filter.setPlaceholderText("Search packages...")
-        self.pkg_filter.textChanged.connect(self._filter_package_list)
+        self._pkg_filter_timer = QTimer(self)
+        self._pkg_filter_timer.setSingleShot(True)
+        self._pkg_filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self._pkg_filter_timer.timeout.connect(self._filter_package_list)
+        self.pkg_filter.textChanged.connect(lambda _: self._pkg_filter_timer.start())
         pkg_filter_row.addWidget(self.pkg_filter)
         pkg_layout.addLayout(pkg_filter_row)
 
         # Package tree
-        self.pkg_tree = QTreeWidget()
-        self.pkg_tree.setHeaderLabels(["Package", "Version"])
+        self.pkg_model = PackageTableModel(self)
+        self.pkg_proxy = QSortFilterProxyModel(self)
+        self.pkg_proxy.setSourceModel(self.pkg_model)
+        self.pkg_proxy.setFilterKeyColumn(0)
+        self.pkg_proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.pkg_proxy.setSortCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+
+        self.pkg_tree = QTreeView()
+        self.pkg_tree.setModel(self.pkg_proxy)
         self.pkg_tree.setRootIsDecorated(False)
+        self.pkg_tree.setUniformRowHeights(True)
         self.pkg_tree.setAlternatingRowColors(True)
         self.pkg_tree.setSortingEnabled(True)
-        self.pkg_tree.setSelectionMode(QTreeWidget.SelectionMode.ExtendedSelection)
+        self.pkg_tree.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.pkg_tree.setSelectionMode(QTreeView.SelectionMode.ExtendedSelection)
         header = self.pkg_tree.header()
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
-        self.pkg_tree.itemSelectionChanged.connect(self._on_package_selected)
+        self.pkg_tree.selectionModel().selectionChanged.connect(self._on_package_selected)
         pkg_layout.addWidget(self.pkg_tree)
 
         # Package actions
@@ -304,35 +430,60 @@ class PyEnvyApp(QMainWindow):
         geom = self.settings.value("geometry")
         if geom:
             self.restoreGeometry(geom)
-        else:
-            self.resize(1000, 650)
+        splitter_state = self.settings.value("splitter")
+        if splitter_state:
+            self.splitter.restoreState(splitter_state)
 
     def closeEvent(self, event):
         self.settings.setValue("geometry", self.saveGeometry())
+        self.settings.setValue("splitter", self.splitter.saveState())
+        self._cfg_save_timer.stop()
         config.save_config(self.cfg)
+        self._cfg_dirty = False
         event.accept()
 
+    # ── Config Persistence ──────────────────────────────────────────
+
+    def _schedule_config_save(self):
+        self._cfg_dirty = True
+        self._cfg_save_timer.start()
+
+    def _flush_config(self):
+        if self._cfg_dirty:
+            config.save_config(self.cfg)
+            self._cfg_dirty = False
+
     # ── Venv List ───────────────────────────────────────────────────
 
-    def _refresh_venvs(self):
+    def _force_refresh_venvs(self):
+        venv_manager.clear_venv_cache()
+        venv_manager.detect_python_versions.cache_clear()
+        CreateVenvDialog.clear_python_installs()
+        self._refresh_venvs(use_scan_cache=False)
+
+    def _refresh_venvs(self, use_scan_cache=True):
         def do_refresh():
             managed = venv_manager.load_managed_venvs(self.cfg.get("managed_venvs", []))
-            discovered = venv_manager.discover_venvs(
+            # A manual refresh rewalks every root and replaces the cache file.
+            scan_cache = config.load_scan_cache() if use_scan_cache else {}
+            discovered, cache_changed = venv_manager.discover_venvs(
                 self.cfg.get("scan_directories", []),
-                self.cfg.get("scan_max_depth", 3)
+                self.cfg.get("scan_max_depth", 3),
+                cache=scan_cache,
             )
+            if cache_changed or not use_scan_cache:
+                config.save_scan_cache(scan_cache)
             seen = set()
             merged = []
-            for v in managed:
-                real = os.path.realpath(v.path)
-                if real not in seen:
-                    merged.append(v)
-                    seen.add(real)
-            for v in discovered:
-                real = os.path.realpath(v.path)
-                if real not in seen:
+            for v in managed + discovered:
+                try:
+                    st = os.stat(v.path)
+                    key = (st.st_dev, st.st_ino)
+                except OSError:
+                    key = v.path
+                if key not in seen:
                     merged.append(v)
-                    seen.add(real)
+                    seen.add(key)
             merged.sort(key=lambda v: v.name.lower())
             return merged
 
@@ -350,39 +501,44 @@ class PyEnvyApp(QMainWindow):
     def _populate_venv_list(self):
         self.venv_list.blockSignals(True)
         self.venv_list.clear()
-        filter_text = self.venv_filter.text().lower()
+        self._venv_names_ci = [v.name.casefold() for v in self.all_venvs]
         for v in self.all_venvs:
-            if filter_text and filter_text not in v.name.lower():
-                continue
             label = f"{v.name}  ({v.python_version})"
             item = QListWidgetItem(label)
             item.setData(Qt.ItemDataRole.UserRole, v.path)
             if not v.is_valid:
-                item.setForeground(Qt.GlobalColor.gray)
+                item.setForeground(self._gray_brush)
             self.venv_list.addItem(item)
+        self._filter_venv_list()
         self.venv_list.blockSignals(False)
 
     def _filter_venv_list(self):
-        self._populate_venv_list()
-
-    def _get_filtered_venvs(self):
-        filter_text = self.venv_filter.text().lower()
-        return [v for v in self.all_venvs
-                if not filter_text or filter_text in v.name.lower()]
+        filter_text = self.venv_filter.text().casefold()
+        for row, name_ci in enumerate(self._venv_names_ci):
+            self.venv_list.item(row).setHidden(bool(filter_text) and filter_text not in name_ci)
 
     # ── Venv Selection ──────────────────────────────────────────────
 
     def _on_venv_selected(self, row):
+        self._pkg_load_timer.stop()
+        self.task_manager.cancel("list_packages")
         if row < 0:
             self.selected_venv = None
             self._update_button_states()
             return
-        filtered = self._get_filtered_venvs()
-        if row >= len(filtered):
+        if row >= len(self.all_venvs):
             return
-        self.selected_venv = filtered[row]
+        self.selected_venv = self.all_venvs[row]
         self._display_venv_details()
-        self._load_packages()
+        cached = self._cached_packages(self.selected_venv.path)
+        if cached is not None:
+            self._on_packages_loaded(cached)
+        else:
+            self.all_packages = []
+            self._populate_package_tree()
+            # Arrow-key navigation fires a selection per row; only list
+            # packages once the selection settles.
+            self._pkg_load_timer.start()
         self._update_button_states()
 
     def _display_venv_details(self):
@@ -401,14 +557,34 @@ class PyEnvyApp(QMainWindow):
 
     # ── Package Management ──────────────────────────────────────────
 
+    def _cached_packages(self, venv_path):
+        cached = self._pkg_cache.get(venv_path)
+        if cached and cached[0] == venv_manager.site_packages_mtime(venv_path):
+            return cached[1]
+        return None
+
     def _load_packages(self):
         if not self.selected_venv:
             return
         venv_path = self.selected_venv.path
+        self.task_manager.cancel("list_packages")
+        cached = self._cached_packages(venv_path)
+        if cached is not None:
+            self._on_packages_loaded(cached)
+            return
+
+        # Taken before listing so a concurrent change invalidates the entry.
+        mtime_key = venv_manager.site_packages_mtime(venv_path)
+
+        def on_loaded(packages):
+            if mtime_key is not None and packages:
+                self._pkg_cache[venv_path] = (mtime_key, packages)
+            self._on_packages_loaded(packages)
+
         self.task_manager.run(
             "list_packages",
             venv_manager.list_packages, (venv_path,),
-            on_success=self._on_packages_loaded,
+            on_success=on_loaded,
             on_error=lambda e: self._on_packages_error(e),
             status_msg="Loading packages..."
         )
@@ -418,24 +594,25 @@ class PyEnvyApp(QMainWindow):
         self._populate_package_tree()
         self.info_labels["Packages"].setText(str(len(packages)))
 
+    def _on_packages_changed(self, venv_path):
+        self._pkg_cache.pop(venv_path, None)
+        self._load_packages()
+
     def _on_packages_error(self, error):
         self.all_packages = []
         self._populate_package_tree()
         self.info_labels["Packages"].setText("Error loading")
 
     def _populate_package_tree(self):
-        self.pkg_tree.clear()
-        filter_text = self.pkg_filter.text().lower()
-        for pkg in self.all_packages:
-            if filter_text and filter_text not in pkg.name.lower():
-                continue
-            item = QTreeWidgetItem([pkg.name, pkg.version])
-            self.pkg_tree.addTopLevelItem(item)
+        self.pkg_model.set_packages(self.all_packages)
 
     def _filter_package_list(self):
-        self._populate_package_tree()
+        self.pkg_proxy.setFilterFixedString(self.pkg_filter.text())
+
+    def _selected_package_names(self):
+        return [index.data() for index in self.pkg_tree.selectionModel().selectedRows(0)]
 
-    def _on_package_selected(self):
+    def _on_package_selected(self, *_):
         self._update_button_states()
 
     def _install_package(self):
@@ -446,51 +623,39 @@ class PyEnvyApp(QMainWindow):
         self.task_manager.run(
             "install_package",
             venv_manager.install_package, (venv_path, pkg_spec),
-            on_success=lambda _: self._load_packages(),
+            on_success=lambda _: self._on_packages_changed(venv_path),
             on_error=lambda e: QMessageBox.critical(self, "Install Error", str(e)),
             status_msg=f"Installing {pkg_spec}..."
         )
         self.pkg_entry.clear()
 
     def _remove_package(self):
-        selected = self.pkg_tree.selectedItems()
-        if not selected or not self.selected_venv:
+        names = self._selected_package_names()
+        if not names or not self.selected_venv:
             return
-        names = [item.text(0) for item in selected]
         reply = QMessageBox.question(
             self, "Confirm Remove", f"Remove {', '.join(names)}?",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply != QMessageBox.StandardButton.Yes:
             return
         venv_path = self.selected_venv.path
-
-        def do_remove():
-            for name in names:
-                venv_manager.remove_package(venv_path, name)
-            return True
-
         self.task_manager.run(
-            "remove_package", do_remove, (),
-            on_success=lambda _: self._load_packages(),
+            "remove_package",
+            venv_manager.remove_packages, (venv_path, names),
+            on_success=lambda _: self._on_packages_changed(venv_path),
             on_error=lambda e: QMessageBox.critical(self, "Remove Error", str(e)),
             status_msg=f"Removing {', '.join(names)}..."
         )
 
     def _upgrade_package(self):
-        selected = self.pkg_tree.selectedItems()
-        if not selected or not self.selected_venv:
+        names = self._selected_package_names()
+        if not names or not self.selected_venv:
             return
-        names = [item.text(0) for item in selected]
         venv_path = self.selected_venv.path
-
-        def do_upgrade():
-            for name in names:
-                venv_manager.upgrade_package(venv_path, name)
-            return True
-
         self.task_manager.run(
-            "upgrade_package", do_upgrade, (),
-            on_success=lambda _: self._load_packages(),
+            "upgrade_package",
+            venv_manager.upgrade_packages, (venv_path, names),
+            on_success=lambda _: self._on_packages_changed(venv_path),
             on_error=lambda e: QMessageBox.critical(self, "Upgrade Error", str(e)),
             status_msg=f"Upgrading {', '.join(names)}..."
         )
@@ -515,7 +680,7 @@ class PyEnvyApp(QMainWindow):
 
     def _on_venv_created(self, venv_info):
         self.cfg = config.add_managed_venv(self.cfg, venv_info.path)
-        config.save_config(self.cfg)
+        self._schedule_config_save()
         self._refresh_venvs()
 
     # ── Delete Venv ─────────────────────────────────────────────────
@@ -544,7 +709,8 @@ class PyEnvyApp(QMainWindow):
 
     def _on_venv_deleted(self, path):
         self.cfg = config.remove_managed_venv(self.cfg, path)
-        config.save_config(self.cfg)
+        self._pkg_cache.pop(path, None)
+        self._schedule_config_save()
         self.selected_venv = None
         self._display_venv_details()
         self.all_packages = []
@@ -582,22 +748,30 @@ class PyEnvyApp(QMainWindow):
         if not directory:
             return
         cfg_path = os.path.join(directory, "pyvenv.cfg")
-        if not os.path.exists(cfg_path):
+        try:
+            is_venv = stat.S_ISREG(os.stat(cfg_path).st_mode)
+        except OSError:
+            is_venv = False
+        if not is_venv:
             QMessageBox.warning(self, "Not a Venv",
                                 "Selected directory does not appear to be a virtual environment.\n"
                                 "(No pyvenv.cfg found)")
             return
         self.cfg = config.add_managed_venv(self.cfg, directory)
-        config.save_config(self.cfg)
+        self._schedule_config_save()
         self._refresh_venvs()
 
     # ── Button State Management ─────────────────────────────────────
 
+    def _on_busy_changed(self, busy):
+        self._busy = busy
+        self._update_button_states()
+
     def _update_button_states(self):
         has_venv = self.selected_venv is not None
         has_valid = has_venv and self.selected_venv.is_valid
-        has_pkg_sel = bool(self.pkg_tree.selectedItems())
-        busy = self.task_manager.any_running()
+        has_pkg_sel = self.pkg_tree.selectionModel().hasSelection()
+        busy = self._busy
 
         self.act_delete.setEnabled(has_venv and not busy)
         self.act_activate.setEnabled(has_valid)
@@ -1,22 +1,33 @@
+import functools
 import glob
 import json
 import os
+import re
 import shlex
 import shutil
+import stat
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import config
+
+
+# subprocess launches here are kept on CPython's posix_spawn fast path
+# (no fork of the GUI's address space): absolute executable paths,
+# close_fds=False, and no preexec_fn, cwd, start_new_session, pass_fds or
+# shell=True. Python's own fds are non-inheritable by default, so
+# close_fds=False leaks nothing. Keep new calls within these rules.
 
 
 class VenvError(Exception):
     pass
 
 
-class PythonInstall:
-    __slots__ = ("path", "version", "source")
-
-    def __init__(self, path, version, source):
-        self.path = path
-        self.version = version
-        self.source = source
+class PythonInstall(NamedTuple):
+    path: str
+    version: str
+    source: str
 
     def __repr__(self):
         return f"PythonInstall({self.version}, {self.source}, {self.path})"
@@ -25,27 +36,21 @@ class PythonInstall:
         return f"Python {self.version} ({self.source})"
 
 
-class VenvInfo:
-    __slots__ = ("name", "path", "python_version", "python_home", "is_valid", "source")
-
-    def __init__(self, name, path, python_version, python_home, is_valid, source):
-        self.name = name
-        self.path = path
-        self.python_version = python_version
-        self.python_home = python_home
-        self.is_valid = is_valid
-        self.source = source
+class VenvInfo(NamedTuple):
+    name: str
+    path: str
+    python_version: str
+    python_home: str
+    is_valid: bool
+    source: str
 
     def __repr__(self):
         return f"VenvInfo({self.name}, {self.python_version}, {self.source})"
 
 
-class PackageInfo:
-    __slots__ = ("name", "version")
-
-    def __init__(self, name, version):
-        self.name = name
-        self.version = version
+class PackageInfo(NamedTuple):
+    name: str
+    version: str
 
 
 SKIP_DIRS = {
@@ -56,30 +61,64 @@ SKIP_DIRS = {
     "Pictures", "Music", "Movies", ".docker",
 }
 
+VENV_DIR_NAMES = {".venv", ".env"}
+
+
+_PY_BIN_RE = re.compile(r"python3(\.\d+)?$")
+
+
+def _scan_bin(dirpath):
+    # One readdir of the bin directory, instead of a glob per pattern that
+    # fnmatches (and for some patterns stats) every entry again.
+    try:
+        with os.scandir(dirpath) as it:
+            return sorted(entry.path for entry in it if _PY_BIN_RE.match(entry.name))
+    except OSError:
+        return []
+
+
+def _probe_version(path):
+    try:
+        result = subprocess.run(
+            [path, "--version"],
+            capture_output=True, text=True, timeout=5, close_fds=False
+        )
+    except (subprocess.TimeoutExpired, FileNotFoundError, PermissionError):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip().replace("Python ", "")
+
+
+def detect_python_versions(force_refresh=False):
+    if force_refresh:
+        _detect_python_versions_cached.cache_clear()
+    installs = list(_detect_python_versions_cached())
+    if not installs:
+        _detect_python_versions_cached.cache_clear()
+    return installs
 
-def detect_python_versions():
-    candidates = []
-    seen_realpaths = set()
 
-    search_patterns = [
-        ("/usr/bin/python3", "system"),
-        ("/opt/homebrew/bin/python3", "homebrew"),
-        ("/opt/homebrew/bin/python3.*[0-9]", "homebrew"),
-        ("/usr/local/bin/python3", "homebrew"),
-        ("/usr/local/bin/python3.*[0-9]", "homebrew"),
-        ("/Library/Frameworks/Python.framework/Versions/*/bin/python3", "python.org"),
+@functools.lru_cache(maxsize=1)
+def _detect_python_versions_cached():
+    found = []
+    seen_realpaths = set()
+    version_cache = config.load_version_cache()
+
+    candidate_groups = [
+        (["/usr/bin/python3"] if os.path.exists("/usr/bin/python3") else [], "system"),
+        (_scan_bin("/opt/homebrew/bin"), "homebrew"),
+        (_scan_bin("/usr/local/bin"), "homebrew"),
+        (sorted(glob.glob("/Library/Frameworks/Python.framework/Versions/*/bin/python3")),
+         "python.org"),
     ]
 
     pyenv_root = os.path.expanduser("~/.pyenv/versions")
     if os.path.isdir(pyenv_root):
-        search_patterns.append((os.path.join(pyenv_root, "*/bin/python3"), "pyenv"))
-
-    for pattern, source in search_patterns:
-        if "*" in pattern or "." in pattern.split("/")[-1]:
-            paths = sorted(glob.glob(pattern))
-        else:
-            paths = [pattern] if os.path.exists(pattern) else []
+        candidate_groups.append(
+            (sorted(glob.glob(os.path.join(pyenv_root, "*/bin/python3"))), "pyenv"))
 
+    for paths, source in candidate_groups:
         for path in paths:
             realpath = os.path.realpath(path)
             if realpath in seen_realpaths:
@@ -88,21 +127,43 @@ def detect_python_versions():
                 continue
 
             try:
-                result = subprocess.run(
-                    [path, "--version"],
-                    capture_output=True, text=True, timeout=5
-                )
-                if result.returncode == 0:
-                    version_str = result.stdout.strip().replace("Python ", "")
-                    seen_realpaths.add(realpath)
-                    candidates.append(PythonInstall(path, version_str, source))
-            except (subprocess.TimeoutExpired, FileNotFoundError, PermissionError):
+                st = os.stat(path)
+            except OSError:
                 continue
-
+            seen_realpaths.add(realpath)
+            cached = version_cache.get(realpath)
+            if cached and cached.get("mtime") == st.st_mtime_ns and cached.get("size") == st.st_size:
+                found.append((path, source, cached["version"]))
+            else:
+                found.append((path, source, (realpath, st)))
+
+    to_probe = [i for i, (_, _, v) in enumerate(found) if isinstance(v, tuple)]
+    if to_probe:
+        # Each probe is an independent interpreter launch, so run them
+        # side by side instead of paying for every startup in turn.
+        with ThreadPoolExecutor(max_workers=min(8, len(to_probe))) as executor:
+            versions = list(executor.map(_probe_version, [found[i][0] for i in to_probe]))
+        for i, version_str in zip(to_probe, versions):
+            path, source, (realpath, st) = found[i]
+            found[i] = (path, source, version_str)
+            if version_str is not None:
+                version_cache[realpath] = {
+                    "mtime": st.st_mtime_ns, "size": st.st_size, "version": version_str,
+                }
+        try:
+            config.save_version_cache(version_cache)
+        except OSError:
+            pass
+
+    candidates = [PythonInstall(path, version, source)
+                  for path, source, version in found if version is not None]
     candidates.sort(key=lambda p: _version_tuple(p.version), reverse=True)
     return candidates
 
 
+detect_python_versions.cache_clear = _detect_python_versions_cached.cache_clear
+
+
 def _version_tuple(version_str):
     try:
         return tuple(int(x) for x in version_str.split(".")[:3])
@@ -113,27 +174,53 @@ def _version_tuple(version_str):
 def parse_pyvenv_cfg(venv_path):
     cfg_path = os.path.join(venv_path, "pyvenv.cfg")
     data = {}
-    if not os.path.exists(cfg_path):
-        return data
     try:
-        with open(cfg_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if "=" in line:
-                    key, _, value = line.partition("=")
-                    data[key.strip()] = value.strip()
-    except IOError:
-        pass
+        fd = os.open(cfg_path, os.O_RDONLY)
+        try:
+            buf = os.read(fd, 65536).decode("utf-8", "replace")
+        finally:
+            os.close(fd)
+    except OSError:
+        return data
+    for line in buf.splitlines():
+        if "=" in line:
+            key, _, value = line.partition("=")
+            data[key.strip()] = value.strip()
     return data
 
 
+_PYVENV_CFG_CACHE = {}
+
+
+def clear_venv_cache():
+    _PYVENV_CFG_CACHE.clear()
+
+
 def _build_venv_info(dirpath, source="discovered"):
-    cfg = parse_pyvenv_cfg(dirpath)
+    # Only the parsed pyvenv.cfg is reused; validity is re-checked every time
+    # because bin/python can break without touching the cfg (e.g. the base
+    # interpreter being uninstalled).
+    cfg_path = os.path.join(dirpath, "pyvenv.cfg")
+    try:
+        st = os.stat(cfg_path)
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _PYVENV_CFG_CACHE.get(cfg_path)
+    if cached is not None and cached[0] == stamp:
+        cfg = cached[1]
+    else:
+        cfg = parse_pyvenv_cfg(dirpath)
+        _PYVENV_CFG_CACHE[cfg_path] = (stamp, cfg)
     if not cfg:
         return None
 
     python_bin = os.path.join(dirpath, "bin", "python")
-    is_valid = os.path.isfile(python_bin) and os.access(python_bin, os.X_OK)
+    try:
+        bin_st = os.stat(python_bin)
+        is_valid = stat.S_ISREG(bin_st.st_mode) and bool(bin_st.st_mode & 0o111)
+    except OSError:
+        is_valid = False
 
     version = cfg.get("version", cfg.get("version_info", "unknown"))
     python_home = cfg.get("home", "")
@@ -148,37 +235,122 @@ def _build_venv_info(dirpath, source="discovered"):
     )
 
 
-def discover_venvs(scan_dirs, max_depth=3):
+def _walk_for_venvs(base_dir, max_depth):
+    venv_dirs = []
+    dir_mtimes = {}
+    complete = True
+    stack = [(base_dir, 0)] if max_depth > 0 else []
+    # Hot loop: bind globals and attribute lookups to locals once.
+    _stat, _scandir = os.stat, os.scandir
+    skip_dirs, venv_dir_names = SKIP_DIRS, VENV_DIR_NAMES
+    push_venv = venv_dirs.append
+
+    while stack:
+        dirpath, depth = stack.pop()
+        try:
+            dir_mtimes[dirpath] = _stat(dirpath).st_mtime_ns
+            has_cfg = False
+            subdirs = []
+            add_subdir = subdirs.append
+            # DirEntry.is_dir(follow_symlinks=False) answers from the
+            # readdir d_type on most filesystems, so this costs no stat.
+            with _scandir(dirpath) as it:
+                for entry in it:
+                    name = entry.name
+                    if name == "pyvenv.cfg":
+                        has_cfg = entry.is_file()
+                        if has_cfg:
+                            break
+                    elif entry.is_dir(follow_symlinks=False) and (
+                        name in venv_dir_names
+                        or (name not in skip_dirs and not name.startswith("."))
+                    ):
+                        add_subdir(entry.path)
+        except OSError:
+            # An unreadable directory can become readable without its mtime
+            # changing, so a walk that hit one must not be cached.
+            complete = False
+            continue
+
+        if has_cfg:
+            push_venv(dirpath)
+            continue
+        child_depth = depth + 1
+        if child_depth < max_depth:
+            stack.extend([(d, child_depth) for d in subdirs])
+
+    return venv_dirs, dir_mtimes, complete
+
+
+def _cached_venv_dirs(entry, max_depth):
+    # A directory's mtime changes whenever an entry is added, removed or
+    # renamed in it, so if no visited directory changed the walk would
+    # produce the same result.
+    if not entry or entry.get("max_depth") != max_depth:
+        return None
+    for path, mtime_ns in entry.get("dirs", {}).items():
+        try:
+            if os.stat(path).st_mtime_ns != mtime_ns:
+                return None
+        except OSError:
+            return None
+    return entry.get("venvs", [])
+
+
+def _venv_dirs_for_root(base_dir, max_depth, cache):
+    # Returns (venv_dirs, walked, entry); entry is the fresh cache entry, or
+    # None when the root wasn't walked or the walk can't be cached.
+    if cache is not None:
+        venv_dirs = _cached_venv_dirs(cache.get(base_dir), max_depth)
+        if venv_dirs is not None:
+            return venv_dirs, False, None
+    venv_dirs, dir_mtimes, complete = _walk_for_venvs(base_dir, max_depth)
+    entry = None
+    if complete:
+        entry = {"max_depth": max_depth, "dirs": dir_mtimes, "venvs": venv_dirs}
+    return venv_dirs, True, entry
+
+
+def discover_venvs(scan_dirs, max_depth=3, cache=None):
     results = []
     seen_paths = set()
 
+    roots = []
     for base_dir in scan_dirs:
         base_dir = os.path.expanduser(base_dir)
-        if not os.path.isdir(base_dir):
-            continue
-
-        for dirpath, dirnames, filenames in os.walk(base_dir, followlinks=False):
-            depth = dirpath[len(base_dir):].count(os.sep)
-            if depth >= max_depth:
-                dirnames.clear()
+        if os.path.isdir(base_dir) and base_dir not in roots:
+            roots.append(base_dir)
+    if not roots:
+        return results, False
+
+    # Walking and reading pyvenv.cfg are syscall-bound and release the GIL,
+    # so roots on different trees (or slow mounts) overlap well in threads.
+    with ThreadPoolExecutor(max_workers=min(8, len(roots) + 4)) as executor:
+        per_root = list(executor.map(
+            lambda d: _venv_dirs_for_root(d, max_depth, cache), roots))
+
+        venv_dirs = []
+        for dirpath in (d for dirs, _, _ in per_root for d in dirs):
+            real = os.path.realpath(dirpath)
+            if real not in seen_paths:
+                seen_paths.add(real)
+                venv_dirs.append(dirpath)
+
+        infos = executor.map(
+            lambda d: _build_venv_info(d, source="discovered"), venv_dirs)
+        results.extend(info for info in infos if info)
+
+    cache_changed = False
+    if cache is not None:
+        for base_dir, (_, walked, entry) in zip(roots, per_root):
+            if not walked:
                 continue
-
-            dirnames[:] = [
-                d for d in dirnames
-                if d not in SKIP_DIRS and not d.startswith(".")
-                or d in (".venv", ".env")
-            ]
-
-            if "pyvenv.cfg" in filenames:
-                real = os.path.realpath(dirpath)
-                if real not in seen_paths:
-                    info = _build_venv_info(dirpath, source="discovered")
-                    if info:
-                        results.append(info)
-                        seen_paths.add(real)
-                dirnames.clear()
-
-    return results
+            if entry is not None:
+                cache[base_dir] = entry
+                cache_changed = True
+            elif cache.pop(base_dir, None) is not None:
+                cache_changed = True
+    return results, cache_changed
 
 
 def load_managed_venvs(managed_paths):
@@ -207,7 +379,7 @@ def create_venv(path, python_path, with_pip=True, system_site_packages=False):
     if system_site_packages:
         cmd.append("--system-site-packages")
 
-    result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=120, close_fds=False)
     if result.returncode != 0:
         raise VenvError(f"Failed to create venv:\n{result.stderr}")
 
@@ -217,26 +389,143 @@ def create_venv(path, python_path, with_pip=True, system_site_packages=False):
     return info
 
 
+def _fast_rmtree(path):
+    # Same guard as shutil.rmtree: scandir would follow a symlinked root and
+    # empty the venv it points at.
+    if stat.S_ISLNK(os.lstat(path).st_mode):
+        raise OSError(f"Cannot call rmtree on a symbolic link: {path}")
+    files = []
+    dirs = []
+    stack = [path]
+    while stack:
+        dirpath = stack.pop()
+        dirs.append(dirpath)
+        with os.scandir(dirpath) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    files.append(entry.path)
+
+    # A venv is thousands of small files; overlap the unlink round-trips,
+    # then remove directories children-first.
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(os.unlink, files))
+    for dirpath in reversed(dirs):
+        os.rmdir(dirpath)
+
+
 def delete_venv(path):
     cfg = os.path.join(path, "pyvenv.cfg")
     if not os.path.exists(cfg):
         raise VenvError(f"Safety check failed: {path} does not appear to be a virtual environment")
-    shutil.rmtree(path)
+    try:
+        _fast_rmtree(path)
+    except OSError:
+        # _fast_rmtree refuses symlinked roots before removing anything, so
+        # this only ever finishes off a real directory (or raises the same).
+        shutil.rmtree(path)
 
 
 def get_venv_python(venv_path):
     return os.path.join(venv_path, "bin", "python")
 
 
+def get_site_packages_dir(venv_path, cfg=None):
+    # Only the lib/pythonX.Y matching the venv's interpreter is live; a venv
+    # upgraded in place can keep an older one around.
+    if cfg is None:
+        cfg = parse_pyvenv_cfg(venv_path)
+    version = cfg.get("version", cfg.get("version_info", ""))
+    major_minor = ".".join(version.split(".")[:2])
+    if not major_minor:
+        return None
+    site_dir = os.path.join(venv_path, "lib", f"python{major_minor}", "site-packages")
+    return site_dir if os.path.isdir(site_dir) else None
+
+
+def site_packages_mtime(venv_path):
+    site_dir = get_site_packages_dir(venv_path)
+    if site_dir is None:
+        return None
+    try:
+        return os.stat(site_dir).st_mtime_ns
+    except OSError:
+        return None
+
+
+_METADATA_NAME_RE = re.compile(rb"^Name:[ \t]*(.+?)[ \t]*\r?$", re.M)
+_METADATA_VERSION_RE = re.compile(rb"^Version:[ \t]*(.+?)[ \t]*\r?$", re.M)
+
+
+def _read_metadata_header(path):
+    try:
+        with open(path, "rb") as f:
+            head = f.read(4096)
+    except OSError:
+        return None
+    name = _METADATA_NAME_RE.search(head)
+    version = _METADATA_VERSION_RE.search(head)
+    if not name or not version:
+        return None
+    return PackageInfo(name.group(1).decode("utf-8", "replace"),
+                       version.group(1).decode("utf-8", "replace"))
+
+
+def _scan_site_packages(site_dir):
+    packages = {}
+    join = os.path.join
+    try:
+        with os.scandir(site_dir) as it:
+            entries = list(it)
+    except OSError:
+        return None
+    for entry in entries:
+        name = entry.name
+        if name.startswith("~"):
+            continue
+        if name.endswith(".dist-info"):
+            metadata = join(entry.path, "METADATA")
+        elif name.endswith(".egg-info"):
+            metadata = join(entry.path, "PKG-INFO") if entry.is_dir() else entry.path
+        else:
+            continue
+        info = _read_metadata_header(metadata)
+        if info:
+            packages.setdefault(info.name.lower(), info)
+    return sorted(packages.values(), key=lambda p: p.name.lower())
+
+
+def _pip_env():
+    # Skip pip's PyPI self-version check, user site-packages and .pyc writes;
+    # none of them affect the result and all add to every launch.
+    return {
+        **os.environ,
+        "PIP_DISABLE_PIP_VERSION_CHECK": "1",
+        "PYTHONNOUSERSITE": "1",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+
+
 def list_packages(venv_path):
+    # pip list only reads *.dist-info/*.egg-info metadata, so read it
+    # directly unless pip would also see the base interpreter's packages.
+    cfg = parse_pyvenv_cfg(venv_path)
+    site_dir = get_site_packages_dir(venv_path, cfg)
+    if site_dir and cfg.get("include-system-site-packages", "false").lower() != "true":
+        packages = _scan_site_packages(site_dir)
+        if packages is not None:
+            return packages
+
     venv_python = get_venv_python(venv_path)
     if not os.path.isfile(venv_python):
         return []
 
     try:
         result = subprocess.run(
-            [venv_python, "-m", "pip", "list", "--format=json"],
-            capture_output=True, text=True, timeout=30
+            [venv_python, "-I", "-m", "pip", "list", "--format=json"],
+            capture_output=True, text=True, timeout=30, env=_pip_env(),
+            close_fds=False
         )
         if result.returncode != 0:
             return []
@@ -246,11 +535,16 @@ def list_packages(venv_path):
         return []
 
 
-def install_package(venv_path, package_spec):
+def _pip_timeout(base, count):
+    return base + 30 * max(count - 1, 0)
+
+
+def install_packages(venv_path, package_specs):
     venv_python = get_venv_python(venv_path)
     result = subprocess.run(
-        [venv_python, "-m", "pip", "install", package_spec],
-        capture_output=True, text=True, timeout=300
+        [venv_python, "-m", "pip", "install", *package_specs],
+        capture_output=True, text=True, timeout=_pip_timeout(300, len(package_specs)),
+        env=_pip_env(), close_fds=False
     )
     output = result.stdout + result.stderr
     if result.returncode != 0:
@@ -258,11 +552,16 @@ def install_package(venv_path, package_spec):
     return output
 
 
-def remove_package(venv_path, package_name):
+def install_package(venv_path, package_spec):
+    return install_packages(venv_path, [package_spec])
+
+
+def remove_packages(venv_path, package_names):
     venv_python = get_venv_python(venv_path)
     result = subprocess.run(
-        [venv_python, "-m", "pip", "uninstall", "-y", package_name],
-        capture_output=True, text=True, timeout=60
+        [venv_python, "-m", "pip", "uninstall", "-y", *package_names],
+        capture_output=True, text=True, timeout=_pip_timeout(60, len(package_names)),
+        env=_pip_env(), close_fds=False
     )
     output = result.stdout + result.stderr
     if result.returncode != 0:
@@ -270,11 +569,16 @@ def remove_package(venv_path, package_name):
     return output
 
 
-def upgrade_package(venv_path, package_name):
+def remove_package(venv_path, package_name):
+    return remove_packages(venv_path, [package_name])
+
+
+def upgrade_packages(venv_path, package_names):
     venv_python = get_venv_python(venv_path)
     result = subprocess.run(
-        [venv_python, "-m", "pip", "install", "--upgrade", package_name],
-        capture_output=True, text=True, timeout=300
+        [venv_python, "-m", "pip", "install", "--upgrade", *package_names],
+        capture_output=True, text=True, timeout=_pip_timeout(300, len(package_names)),
+        env=_pip_env(), close_fds=False
     )
     output = result.stdout + result.stderr
     if result.returncode != 0:
@@ -282,6 +586,10 @@ def upgrade_package(venv_path, package_name):
     return output
 
 
+def upgrade_package(venv_path, package_name):
+    return upgrade_packages(venv_path, [package_name])
+
+
 def activate_in_terminal(venv_path):
     activate_path = os.path.join(venv_path, "bin", "activate")
     if not os.path.exists(activate_path):
@@ -293,8 +601,8 @@ def activate_in_terminal(venv_path):
         '    activate\n'
         'end tell'
     )
-    subprocess.run(["/usr/bin/osascript", "-e", script], timeout=10)
+    subprocess.run(["/usr/bin/osascript", "-e", script], timeout=10, close_fds=False)
 
 
 def reveal_in_finder(path):
-    subprocess.run(["open", "-R", path], timeout=5)
+    subprocess.run(["/usr/bin/open", "-R", path], timeout=5, close_fds=False)
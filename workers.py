@@ -1,14 +1,21 @@
-from PyQt6.QtCore import QThread, pyqtSignal, QObject
+from PyQt6.QtCore import QObject, QRunnable, QThread, QThreadPool, QTimer, pyqtSignal, pyqtSlot
 
 
 class WorkerSignals(QObject):
     finished = pyqtSignal(object)
     error = pyqtSignal(Exception)
 
+    def __init__(self):
+        super().__init__()
+        self.task_id = None
+        self.on_success = None
+        self.on_error = None
+        self.in_batch = False
 
-class BackgroundTask(QThread):
-    def __init__(self, func, args, parent=None):
-        super().__init__(parent)
+
+class BackgroundTask(QRunnable):
+    def __init__(self, func, args):
+        super().__init__()
         self.signals = WorkerSignals()
         self.func = func
         self.args = args
@@ -21,38 +28,127 @@ class BackgroundTask(QThread):
             self.signals.error.emit(e)
 
 
-class TaskManager:
-    def __init__(self, status_callback=None):
+class TaskManager(QObject):
+    busyChanged = pyqtSignal(bool)
+
+    def __init__(self, status_callback=None, parent=None):
+        super().__init__(parent)
         self._tasks = {}
+        self._cancelled = set()
+        # Started tasks' signals, kept alive until their result is delivered:
+        # a reused task_id drops the old entry from _tasks, and sender()
+        # can't recover a WorkerSignals whose wrapper was collected.
+        self._live = set()
         self._status_callback = status_callback
+        self._pending_batch = 0
+        self._ready_pending = False
+        # A private pool so long pip runs can't starve (or be starved by)
+        # other users of the global one; keep a floor for small machines.
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(4, QThread.idealThreadCount()))
 
-    def run(self, task_id, func, args, on_success, on_error=None, status_msg=None):
-        if status_msg and self._status_callback:
-            self._status_callback(status_msg, busy=True)
+    def _add_task(self, task_id, signals):
+        was_busy = bool(self._tasks)
+        self._tasks[task_id] = signals
+        if not was_busy:
+            self.busyChanged.emit(True)
+
+    def _remove_task(self, task_id, signals):
+        if self._tasks.get(task_id) is signals:
+            del self._tasks[task_id]
+            if not self._tasks:
+                self.busyChanged.emit(False)
+
+    def _set_status(self, msg, busy):
+        self._ready_pending = False
+        if self._status_callback:
+            self._status_callback(msg, busy=busy)
 
+    def _schedule_ready(self):
+        # Several tasks finishing in the same event-loop pass only need one
+        # "Ready" repaint.
+        if self._tasks or self._pending_batch or self._ready_pending:
+            return
+        self._ready_pending = True
+        QTimer.singleShot(0, self._flush_ready)
+
+    def _flush_ready(self):
+        if self._ready_pending:
+            self._set_status("Ready", busy=False)
+
+    def _start(self, task_id, func, args, on_success, on_error, in_batch):
         task = BackgroundTask(func, args)
+        signals = task.signals
+        signals.task_id = task_id
+        signals.on_success = on_success
+        signals.on_error = on_error
+        signals.in_batch = in_batch
+        signals.finished.connect(self._on_task_finished)
+        signals.error.connect(self._on_task_error)
+        self._live.add(signals)
+        self._add_task(task_id, signals)
+        self._pool.start(task)
+
+    def run(self, task_id, func, args, on_success, on_error=None, status_msg=None):
+        if status_msg:
+            self._set_status(status_msg, busy=True)
+        self._start(task_id, func, args, on_success, on_error, False)
+
+    def run_batch(self, jobs, status_msg=None, on_error=None):
+        if not jobs:
+            return
+        if status_msg:
+            self._set_status(status_msg, busy=True)
+        self._pending_batch += len(jobs)
+        for task_id, func, args, on_success in jobs:
+            self._start(task_id, func, args, on_success, on_error, True)
+
+    def _batch_done(self, signals):
+        if signals.in_batch:
+            signals.in_batch = False
+            self._pending_batch -= 1
+
+    def _take_finished(self, signals):
+        if signals not in self._live:
+            return False
+        self._live.discard(signals)
+        if signals in self._cancelled:
+            self._cancelled.discard(signals)
+            return False
+        self._remove_task(signals.task_id, signals)
+        self._batch_done(signals)
+        return True
 
-        def on_finished(result):
-            self._tasks.pop(task_id, None)
-            if self._status_callback:
-                self._status_callback("Ready", busy=False)
-            on_success(result)
+    @pyqtSlot(object)
+    def _on_task_finished(self, result):
+        signals = self.sender()
+        if not self._take_finished(signals):
+            return
+        self._schedule_ready()
+        signals.on_success(result)
 
-        def on_task_error(error):
-            self._tasks.pop(task_id, None)
-            if self._status_callback:
-                self._status_callback(f"Error: {error}", busy=False)
-            if on_error:
-                on_error(error)
+    @pyqtSlot(Exception)
+    def _on_task_error(self, error):
+        signals = self.sender()
+        if not self._take_finished(signals):
+            return
+        self._set_status(f"Error: {error}", busy=False)
+        if signals.on_error:
+            signals.on_error(error)
 
-        task.signals.finished.connect(on_finished)
-        task.signals.error.connect(on_task_error)
-        self._tasks[task_id] = task
-        task.start()
+    def cancel(self, task_id):
+        signals = self._tasks.get(task_id)
+        if signals is None:
+            return
+        # A running task can't be interrupted; remember it so its result is
+        # dropped when it reports back.
+        self._cancelled.add(signals)
+        self._remove_task(task_id, signals)
+        self._batch_done(signals)
+        self._schedule_ready()
 
     def is_running(self, task_id):
-        task = self._tasks.get(task_id)
-        return task is not None and task.isRunning()
+        return task_id in self._tasks
 
     def any_running(self):
-        return any(t.isRunning() for t in self._tasks.values())
+        return bool(self._tasks)